@@ -5,11 +5,17 @@ from torchvision import transforms
 import pytorch_lightning as pl
 
 class MNISTDataModule(pl.LightningDataModule):
-    def __init__(self, data_dir='./data', batch_size=64, num_workers=4):
+    def __init__(self, data_dir='./data', batch_size=64, num_workers=4,
+                 persistent_workers=True, pin_memory=True, prefetch_factor=4):
         super().__init__()
         self.data_dir = data_dir
         self.batch_size = batch_size
         self.num_workers = num_workers
+        # Keep workers alive between epochs, pin host memory for async
+        # H2D copies, and prefetch ahead so the GPU never waits on the CPU
+        self.persistent_workers = persistent_workers and num_workers > 0
+        self.pin_memory = pin_memory
+        self.prefetch_factor = prefetch_factor if num_workers > 0 else None
         self.transform = transforms.Compose([
             transforms.ToTensor(),
             transforms.Normalize((0.1307,), (0.3081,))
@@ -30,11 +36,21 @@ class MNISTDataModule(pl.LightningDataModule):
         if stage == 'test' or stage is None:
             self.mnist_test = MNIST(self.data_dir, train=False, transform=self.transform)
     
+    def _dataloader(self, dataset):
+        return DataLoader(
+            dataset,
+            batch_size=self.batch_size,
+            num_workers=self.num_workers,
+            persistent_workers=self.persistent_workers,
+            pin_memory=self.pin_memory,
+            prefetch_factor=self.prefetch_factor
+        )
+
     def train_dataloader(self):
-        return DataLoader(self.mnist_train, batch_size=self.batch_size, num_workers=self.num_workers)
-    
+        return self._dataloader(self.mnist_train)
+
     def val_dataloader(self):
-        return DataLoader(self.mnist_val, batch_size=self.batch_size, num_workers=self.num_workers)
-    
+        return self._dataloader(self.mnist_val)
+
     def test_dataloader(self):
-        return DataLoader(self.mnist_test, batch_size=self.batch_size, num_workers=self.num_workers)
\ No newline at end of file
+        return self._dataloader(self.mnist_test)
\ No newline at end of file
@@ -7,16 +7,25 @@ This script provides inference capabilities for the trained phin music model.
 
 import torch
 import json
+from functools import lru_cache
 from pathlib import Path
 from litgpt import LLM
 
+
+@lru_cache(maxsize=2)
+def _get_llm(model_path: str):
+    """Load each model once per process and share it across instances."""
+    model = LLM.load(model_path)
+    model.eval()
+    return model
+
+
 class PhinAIModel:
     """Inference wrapper for phin music model."""
-    
+
     def __init__(self, model_path: str):
         """Initialize the model."""
-        self.model = LLM.load(model_path)
-        self.model.eval()
+        self.model = _get_llm(model_path)
     
     def analyze_phin_audio(self, audio_path: str) -> dict:
         """